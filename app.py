@@ -1,6 +1,11 @@
 import pickle
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+import zstandard
+import orjson
 import os
 
 # --- Page Config ---
@@ -153,49 +158,155 @@ st.markdown('<h1 class="main-header">CineMatch</h1>', unsafe_allow_html=True)
 st.markdown('<p style="text-align:center; font-size:1.2rem; color:#aaa; margin-bottom:2rem;">Discover your next favorite movie</p>', unsafe_allow_html=True)
 
 # --- Load Data ---
-@st.cache_data
-def load_data():
+# Formats in the order they are tried; .zst comes from prepare_for_github.py
+# and .gz from older builds
+ARTIFACT_FORMATS = ('pkl.zst', 'pkl.gz', 'pkl')
+
+def load_artifact(name, formats=ARTIFACT_FORMATS):
+    """Load the first copy of a pickled artifact found in the given formats."""
     import gzip
-    # Try to load compressed files first, then fallback to uncompressed
-    try:
-        with gzip.open('artifacts/movies.pkl.gz', 'rb') as f:
-            movies = pickle.load(f)
-        with gzip.open('artifacts/similarity.pkl.gz', 'rb') as f:
-            similarity = pickle.load(f)
-    except FileNotFoundError:
-        # Fallback to uncompressed files
-        movies = pickle.load(open('artifacts/movies.pkl', 'rb'))
-        similarity = pickle.load(open('artifacts/similarity.pkl', 'rb'))
-    return movies, similarity
+    for fmt in formats:
+        path = f'artifacts/{name}.{fmt}'
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            if fmt.endswith('.zst'):
+                return pickle.load(zstandard.ZstdDecompressor().stream_reader(f))
+            if fmt.endswith('.gz'):
+                with gzip.GzipFile(fileobj=f) as gz:
+                    return pickle.load(gz)
+            return pickle.load(f)
+    raise FileNotFoundError(f"No artifacts/{name} file found (tried {', '.join(formats)})")
+
+def check_same_build(movies, neighbour_data, source):
+    """Refuse to serve neighbours that index into a different movies table."""
+    if len(neighbour_data) != len(movies):
+        raise RuntimeError(
+            f"{source} has {len(neighbour_data)} rows but the movies table has {len(movies)}; "
+            "they come from different builds. Re-run scripts/generate_model.py or scripts/download_models.py."
+        )
+
+def unpack_neighbours():
+    """Decompress a hosted topk.npy.zst so it can be memory-mapped."""
+    path = 'artifacts/topk.npy'
+    if os.path.exists(path) or not os.path.exists(f'{path}.zst'):
+        return
+    # Write to a temporary name first so a partial file is never picked up
+    with open(f'{path}.zst', 'rb') as f_in, open(f'{path}.tmp', 'wb') as f_out:
+        zstandard.ZstdDecompressor().copy_stream(f_in, f_out)
+    os.replace(f'{path}.tmp', path)
 
-movies, similarity = load_data()
+def load_build():
+    """Return the movies table with the neighbour data from the same build."""
+    unpack_neighbours()
+    if os.path.exists('artifacts/topk.npy'):
+        # generate_model.py writes movies.pkl next to topk.npy, and
+        # prepare_for_github.py compresses it to .zst; the .gz copy belongs
+        # to the older dense-matrix build
+        movies = load_artifact('movies', ('pkl', 'pkl.zst'))
+        # Only the rows actually looked up get paged in from disk
+        neighbours = np.load('artifacts/topk.npy', mmap_mode='r')
+        check_same_build(movies, neighbours, 'topk.npy')
+        return movies, neighbours, None
+    # Older artifacts pair a movies table with the dense similarity matrix;
+    # take both from the same format so they come from the same build
+    for fmt in ARTIFACT_FORMATS:
+        if os.path.exists(f'artifacts/similarity.{fmt}'):
+            movies = load_artifact('movies', (fmt,))
+            similarity = load_artifact('similarity', (fmt,))
+            break
+    else:
+        raise FileNotFoundError("No neighbour artifacts found; run scripts/generate_model.py or scripts/download_models.py")
+    check_same_build(movies, similarity, f'similarity.{fmt}')
+    # Contiguous float32 halves the float64 footprint and keeps each row a
+    # single flat buffer, which is plenty of precision for ranking
+    similarity = np.ascontiguousarray(similarity, dtype=np.float32)
+    return movies, None, similarity
+
+# cache_resource hands back the same objects on every rerun instead of
+# unpickling a copy, which keeps the memory-mapped array mapped
+@st.cache_resource
+def load_data():
+    movies, neighbours, similarity = load_build()
+    # Plain arrays avoid building a pandas row object per lookup
+    titles = movies['title'].to_numpy()
+    ids = movies['movie_id'].to_numpy()
+    # Poster URLs prefetched by generate_model.py; older artifacts lack them
+    if 'poster_url' in movies:
+        # Missing entries load as NaN under newer pandas; normalise them to None
+        poster_urls = movies['poster_url'].astype(object)
+        posters = poster_urls.where(poster_urls.notna(), None).to_numpy()
+    else:
+        posters = None
+    # O(1) title lookup; setdefault keeps the first row for duplicate titles
+    title_to_index = {}
+    for i, title in enumerate(titles):
+        title_to_index.setdefault(title, i)
+    return titles, ids, posters, title_to_index, neighbours, similarity
+
+titles, ids, posters, title_to_index, neighbours, similarity = load_data()
 
 # --- Recommendation Engine ---
 def recommend(movie):
-    index = movies[movies['title'] == movie].index[0]
-    distances = sorted(enumerate(similarity[index]), key=lambda x: x[1], reverse=True)
+    index = title_to_index[movie]
+    if neighbours is not None:
+        # Precomputed neighbours are already sorted by similarity
+        idx = np.asarray(neighbours[index])
+    else:
+        row = similarity[index]
+        # Partial top-6 selection in O(N), then order just those 6 by score;
+        # partitioning on -6 avoids allocating a negated copy of the row
+        idx = np.argpartition(row, -6)[-6:]
+        idx = idx[np.argsort(row[idx])[::-1]]
+    idx = idx[idx != index][:5]
+    match_titles = titles[idx]
+    match_ids = ids[idx]
+    match_posters = list(posters[idx]) if posters is not None else [None] * len(idx)
+    # Prefetched posters need no HTTP; only movies without one are looked up live
+    missing = [i for i, poster in enumerate(match_posters) if not poster]
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        lookups = executor.map(fetch_movie, [match_ids[i] for i in missing])
+        for i, details in zip(missing, lookups):
+            match_posters[i] = details['poster']
+        # Warm the image cache so rendering the cards doesn't download serially
+        list(executor.map(fetch_image, [poster for poster in match_posters if poster]))
     return [
         {
-            'title': movies.iloc[i[0]].title,
-            'poster': fetch_poster(movies.iloc[i[0]].movie_id),
-            'id': movies.iloc[i[0]].movie_id
-        } 
-        for i in distances[1:6]
+            'title': title,
+            'poster': poster,
+            'id': movie_id
+        }
+        for title, movie_id, poster in zip(match_titles, match_ids, match_posters)
     ]
 
 # --- TMDB API Integration ---
 # Get API key from environment variable or use default (for development)
 TMDB_API_KEY = os.getenv('TMDB_API_KEY', '37f9391204e401d0a27a74894f911d05')
 
-def fetch_poster(movie_id):
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_API_KEY}"
-    data = requests.get(url).json()
-    return f"https://image.tmdb.org/t/p/w500/{data.get('poster_path', '')}" if data.get('poster_path') else None
+# Shared session so TMDB calls reuse keep-alive connections instead of
+# paying a TCP+TLS handshake on every request
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10))
 
-def fetch_movie_details(movie_id):
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_API_KEY}"
-    data = requests.get(url).json()
+# Bounded so poster bytes from every session don't pile up in memory
+@st.cache_data(ttl=86400, max_entries=200, show_spinner=False)
+def _download_image(url):
+    # Serve poster bytes from our cache rather than having the browser hit the CDN
+    response = _SESSION.get(url, timeout=5)
+    response.raise_for_status()
+    return response.content
+
+def fetch_image(url):
+    # Failures raise inside the cached helper, so they are retried rather than cached
+    try:
+        return _download_image(url)
+    except requests.RequestException:
+        return None
+
+def movie_fields(data):
+    """Pick the poster and details shown in the app out of a TMDB movie payload."""
     return {
+        'poster': f"https://image.tmdb.org/t/p/w500/{data.get('poster_path', '')}" if data.get('poster_path') else None,
         'overview': data.get("overview", "No overview available."),
         'rating': data.get("vote_average", "N/A"),
         'release_date': data.get("release_date", "N/A"),
@@ -203,6 +314,23 @@ def fetch_movie_details(movie_id):
         'genres': ", ".join([g['name'] for g in data.get('genres', [])])
     }
 
+@st.cache_data(ttl=86400, show_spinner=False)
+def _fetch_movie(movie_id):
+    # One /movie/{id} call covers both the poster and the details view
+    url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_API_KEY}"
+    response = _SESSION.get(url, timeout=5)
+    # Raise on TMDB errors (e.g. 429) so the error body isn't cached as real data
+    response.raise_for_status()
+    return movie_fields(orjson.loads(response.content))
+
+def fetch_movie(movie_id):
+    # Failures raise inside the cached helper, so they are retried rather than
+    # cached; placeholders keep the rest of the page usable meanwhile
+    try:
+        return _fetch_movie(movie_id)
+    except (requests.RequestException, orjson.JSONDecodeError):
+        return movie_fields({})
+
 # --- Main App ---
 def main():
     # Session state initialization
@@ -214,7 +342,7 @@ def main():
     # Movie selection - blank by default
     selected_movie = st.selectbox(
         "Search for a movie you love:",
-        movies['title'].values,
+        titles,
         index=None,  # This makes it blank by default
         placeholder="Enter movie name...",
         key="movie_select"
@@ -238,8 +366,9 @@ def main():
                     st.markdown('<div class="movie-card">', unsafe_allow_html=True)
                     st.markdown('<div class="card-content">', unsafe_allow_html=True)
                     
-                    if movie['poster']:
-                        st.image(movie['poster'], use_container_width=True, output_format="auto")
+                    image = fetch_image(movie['poster']) if movie['poster'] else None
+                    if image:
+                        st.image(image, use_container_width=True)
                     
                     # Truncated title with ellipsis
                     title = movie['title'] if len(movie['title']) <= 25 else f"{movie['title'][:22]}..."
@@ -257,13 +386,16 @@ def main():
     # Movie details modal
     if st.session_state.show_details:
         movie = st.session_state.show_details
-        details = fetch_movie_details(movie['id'])
+        # Fetched on first open; cached, so reopening makes no new call
+        details = fetch_movie(movie['id'])
         
         with st.container():
             st.markdown('<div class="details-container">', unsafe_allow_html=True)
             col1, col2 = st.columns([1, 2])
             with col1:
-                st.image(movie['poster'], width=250, output_format="auto")  # Fixed width
+                image = fetch_image(movie['poster']) if movie['poster'] else None
+                if image:
+                    st.image(image, width=250)  # Fixed width
             with col2:
                 st.markdown(f"<h2>{movie['title']}</h2>", unsafe_allow_html=True)
                 # Format rating to one decimal place if not "N/A"
@@ -7,8 +7,8 @@ This script downloads the compressed model files needed for the movie recommenda
 
 import os
 import urllib.request
-import gzip
 import pickle
+import zstandard
 
 def download_and_decompress():
     """Download and decompress model files."""
@@ -18,13 +18,13 @@ def download_and_decompress():
     
     # URLs for compressed model files (you'll need to host these)
     model_files = {
-        'similarity.pkl.gz': 'https://your-hosting-service.com/models/similarity.pkl.gz',
-        'movies.pkl.gz': 'https://your-hosting-service.com/models/movies.pkl.gz',
-        'movies_dict.pkl.gz': 'https://your-hosting-service.com/models/movies_dict.pkl.gz'
+        'movies.pkl.zst': 'https://your-hosting-service.com/models/movies.pkl.zst',
+        'movies_dict.pkl.zst': 'https://your-hosting-service.com/models/movies_dict.pkl.zst',
+        'topk.npy.zst': 'https://your-hosting-service.com/models/topk.npy.zst'
     }
     
     for filename, url in model_files.items():
-        output_path = f'artifacts/{filename.replace(".gz", "")}'
+        output_path = f'artifacts/{filename.replace(".zst", "")}'
         
         if not os.path.exists(output_path):
             print(f"Downloading {filename}...")
@@ -33,9 +33,9 @@ def download_and_decompress():
                 urllib.request.urlretrieve(url, f'artifacts/{filename}')
                 
                 # Decompress
-                with gzip.open(f'artifacts/{filename}', 'rb') as f_in:
+                with open(f'artifacts/{filename}', 'rb') as f_in:
                     with open(output_path, 'wb') as f_out:
-                        f_out.write(f_in.read())
+                        zstandard.ZstdDecompressor().copy_stream(f_in, f_out)
                 
                 # Remove compressed file
                 os.remove(f'artifacts/{filename}')
@@ -45,7 +45,7 @@ def download_and_decompress():
                 print(f"Failed to download {filename}: {e}")
                 print("Please manually download the model files")
         else:
-            print(f"{filename.replace('.gz', '')} already exists")
+            print(f"{filename.replace('.zst', '')} already exists")
 
 if __name__ == "__main__":
     print("CineMatch Model Downloader")
@@ -2,16 +2,31 @@
 Data Processing Script for CineMatch Movie Recommendation System
 
 This script processes the raw TMDB movie data and generates the necessary
-pickle files for the recommendation system.
+model files for the recommendation system.
 """
 
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.neighbors import NearestNeighbors
+import orjson
 import pickle
 import os
 import sys
+import time
+
+# Number of neighbours kept per movie; the app only shows 5
+TOP_K = 50
+
+# Used to prefetch poster URLs; the prefetch is skipped when it isn't set
+TMDB_API_KEY = os.getenv('TMDB_API_KEY')
+
+# Kept low to stay under TMDB's rate limit
+POSTER_FETCH_WORKERS = 8
+POSTER_FETCH_RETRIES = 5
 
 def load_and_clean_data():
     """Load and clean the movie data from CSV files."""
@@ -39,19 +54,17 @@ def load_and_clean_data():
     return movies
 
 def extract_features(text):
-    """Extract features from JSON-like strings."""
-    import ast
+    """Extract features from JSON strings."""
     try:
-        features = ast.literal_eval(text)
+        features = orjson.loads(text)
         return ' '.join([feature['name'] for feature in features])
     except:
         return ''
 
 def extract_director(crew_text):
     """Extract director name from crew information."""
-    import ast
     try:
-        crew = ast.literal_eval(crew_text)
+        crew = orjson.loads(crew_text)
         for person in crew:
             if person['job'] == 'Director':
                 return person['name']
@@ -59,9 +72,32 @@ def extract_director(crew_text):
     except:
         return ''
 
-def create_soup(x):
-    """Create a combined text soup for TF-IDF vectorization."""
-    return ' '.join([x['overview'], x['genres'], x['keywords'], x['cast'], x['director']])
+def fetch_poster_urls(movie_ids):
+    """Fetch TMDB poster URLs in parallel, returning (urls, failed lookups)."""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_maxsize=POSTER_FETCH_WORKERS))
+    failures = []
+    
+    def fetch(movie_id):
+        url = f"https://api.themoviedb.org/3/movie/{movie_id}?api_key={TMDB_API_KEY}"
+        for attempt in range(POSTER_FETCH_RETRIES):
+            try:
+                response = session.get(url, timeout=10)
+                if response.status_code == 429:
+                    # Rate limited: back off exponentially and retry
+                    time.sleep(2 ** attempt)
+                    continue
+                response.raise_for_status()
+                poster_path = response.json().get('poster_path')
+                return f"https://image.tmdb.org/t/p/w500/{poster_path}" if poster_path else None
+            except requests.RequestException as e:
+                failures.append((movie_id, e))
+                return None
+        failures.append((movie_id, 'still rate limited after retries'))
+        return None
+    
+    with ThreadPoolExecutor(max_workers=POSTER_FETCH_WORKERS) as executor:
+        return list(executor.map(fetch, movie_ids)), failures
 
 def generate_model():
     """Generate the recommendation model and save pickle files."""
@@ -77,17 +113,38 @@ def generate_model():
     movies['cast'] = movies['cast'].apply(extract_features)
     movies['director'] = movies['crew'].apply(extract_director)
     
-    # Create soup for TF-IDF
-    movies['soup'] = movies.apply(create_soup, axis=1)
-    
-    # TF-IDF Vectorization
-    print("Creating TF-IDF vectors...")
-    tfidf = TfidfVectorizer(stop_words='english')
-    tfidf_matrix = tfidf.fit_transform(movies['soup'])
-    
-    # Calculate cosine similarity
-    print("Calculating similarity matrix...")
-    similarity = cosine_similarity(tfidf_matrix, tfidf_matrix)
+    # Create text soup (vectorised concat instead of a row-wise apply)
+    movies['soup'] = movies['overview'].fillna('').str.cat(
+        [movies['genres'], movies['keywords'], movies['cast'], movies['director']], sep=' '
+    )
+    
+    # Hashed term vectors: no vocabulary to fit and a fixed feature count
+    print("Creating hashed term vectors...")
+    vectorizer = HashingVectorizer(stop_words='english', n_features=2**15, norm='l2', alternate_sign=False)
+    term_matrix = vectorizer.transform(movies['soup'])
+    
+    # Find nearest neighbours by cosine distance. Rows are already
+    # L2-normalised, and this avoids materialising the full N x N matrix.
+    print(f"Finding top {TOP_K} neighbours per movie...")
+    nn = NearestNeighbors(n_neighbors=TOP_K, metric='cosine', algorithm='brute')
+    nn.fit(term_matrix)
+    # Distances are never used, so skip returning them
+    topk = nn.kneighbors(term_matrix, return_distance=False)
+    
+    # Prefetch poster URLs so the app can show posters without TMDB calls
+    if not TMDB_API_KEY:
+        print("Warning: TMDB_API_KEY is not set; skipping poster URL prefetch")
+    else:
+        print("Fetching poster URLs...")
+        poster_urls, failures = fetch_poster_urls(movies['movie_id'])
+        if failures:
+            movie_id, error = failures[0]
+            print(f"Warning: {len(failures)} poster lookups failed (e.g. movie {movie_id}: {error})")
+        if len(failures) == len(movies):
+            print("Warning: no poster URLs fetched; skipping the poster_url column")
+        else:
+            movies['poster_url'] = poster_urls
+            print(f"Fetched {movies['poster_url'].notna().sum()} of {len(movies)} poster URLs")
     
     # Create movies dictionary for easy lookup
     movies_dict = movies.set_index('title')['movie_id'].to_dict()
@@ -96,24 +153,23 @@ def generate_model():
     print("Saving model files...")
     os.makedirs('artifacts', exist_ok=True)
     
-    # Save similarity matrix
-    with open('artifacts/similarity.pkl', 'wb') as f:
-        pickle.dump(similarity, f)
-    print("Saved similarity.pkl")
+    # Save top-K neighbour indices as .npy so the app can memory-map them
+    np.save('artifacts/topk.npy', topk.astype(np.int32))
+    print("Saved topk.npy")
     
     # Save movies dataframe
     with open('artifacts/movies.pkl', 'wb') as f:
-        pickle.dump(movies, f)
+        pickle.dump(movies, f, protocol=pickle.HIGHEST_PROTOCOL)
     print("Saved movies.pkl")
     
     # Save movies dictionary
     with open('artifacts/movies_dict.pkl', 'wb') as f:
-        pickle.dump(movies_dict, f)
+        pickle.dump(movies_dict, f, protocol=pickle.HIGHEST_PROTOCOL)
     print("Saved movies_dict.pkl")
     
     print("Model generation completed successfully!")
     print(f"Files saved in artifacts/ directory:")
-    print(f"- similarity.pkl ({os.path.getsize('artifacts/similarity.pkl') / (1024*1024):.1f} MB)")
+    print(f"- topk.npy ({os.path.getsize('artifacts/topk.npy') / (1024*1024):.1f} MB)")
     print(f"- movies.pkl ({os.path.getsize('artifacts/movies.pkl') / (1024*1024):.1f} MB)")
     print(f"- movies_dict.pkl ({os.path.getsize('artifacts/movies_dict.pkl') / (1024*1024):.1f} MB)")
 
@@ -8,22 +8,22 @@ This script helps prepare the project for GitHub deployment by:
 """
 
 import os
-import gzip
 import shutil
 import pickle
+import zstandard
 from pathlib import Path
 
 def compress_pickle_file(input_path, output_path):
-    """Compress a pickle file using gzip."""
+    """Compress a model artifact file using zstandard."""
     print(f"Compressing {input_path}...")
     
-    # Read the pickle file
+    # Read the file
     with open(input_path, 'rb') as f:
         data = f.read()
     
-    # Compress and save
-    with gzip.open(output_path, 'wb') as f:
-        f.write(data)
+    # Compress and save (level 3 decodes far faster than gzip at a similar ratio)
+    with open(output_path, 'wb') as f:
+        f.write(zstandard.ZstdCompressor(level=3).compress(data))
     
     original_size = os.path.getsize(input_path) / (1024 * 1024)
     compressed_size = os.path.getsize(output_path) / (1024 * 1024)
@@ -31,11 +31,11 @@ def compress_pickle_file(input_path, output_path):
     print(f"Compressed {input_path}: {original_size:.1f}MB -> {compressed_size:.1f}MB ({compressed_size/original_size*100:.1f}% reduction)")
 
 def decompress_pickle_file(input_path, output_path):
-    """Decompress a gzipped pickle file."""
+    """Decompress a zstandard-compressed pickle file."""
     print(f"Decompressing {input_path}...")
     
-    with gzip.open(input_path, 'rb') as f:
-        data = f.read()
+    with open(input_path, 'rb') as f:
+        data = zstandard.ZstdDecompressor().stream_reader(f).read()
     
     with open(output_path, 'wb') as f:
         f.write(data)
@@ -53,8 +53,8 @@ This script downloads the compressed model files needed for the movie recommenda
 
 import os
 import urllib.request
-import gzip
 import pickle
+import zstandard
 
 def download_and_decompress():
     """Download and decompress model files."""
@@ -64,13 +64,13 @@ def download_and_decompress():
     
     # URLs for compressed model files (you'll need to host these)
     model_files = {
-        'similarity.pkl.gz': 'https://your-hosting-service.com/models/similarity.pkl.gz',
-        'movies.pkl.gz': 'https://your-hosting-service.com/models/movies.pkl.gz',
-        'movies_dict.pkl.gz': 'https://your-hosting-service.com/models/movies_dict.pkl.gz'
+        'movies.pkl.zst': 'https://your-hosting-service.com/models/movies.pkl.zst',
+        'movies_dict.pkl.zst': 'https://your-hosting-service.com/models/movies_dict.pkl.zst',
+        'topk.npy.zst': 'https://your-hosting-service.com/models/topk.npy.zst'
     }
     
     for filename, url in model_files.items():
-        output_path = f'artifacts/{filename.replace(".gz", "")}'
+        output_path = f'artifacts/{filename.replace(".zst", "")}'
         
         if not os.path.exists(output_path):
             print(f"Downloading {filename}...")
@@ -79,9 +79,9 @@ def download_and_decompress():
                 urllib.request.urlretrieve(url, f'artifacts/{filename}')
                 
                 # Decompress
-                with gzip.open(f'artifacts/{filename}', 'rb') as f_in:
+                with open(f'artifacts/{filename}', 'rb') as f_in:
                     with open(output_path, 'wb') as f_out:
-                        f_out.write(f_in.read())
+                        zstandard.ZstdDecompressor().copy_stream(f_in, f_out)
                 
                 # Remove compressed file
                 os.remove(f'artifacts/{filename}')
@@ -91,7 +91,7 @@ def download_and_decompress():
                 print(f"Failed to download {filename}: {e}")
                 print("Please manually download the model files")
         else:
-            print(f"{filename.replace('.gz', '')} already exists")
+            print(f"{filename.replace('.zst', '')} already exists")
 
 if __name__ == "__main__":
     print("CineMatch Model Downloader")
@@ -167,8 +167,12 @@ def main():
     if artifacts_dir.exists():
         for pickle_file in artifacts_dir.glob('*.pkl'):
             if pickle_file.stat().st_size > 10 * 1024 * 1024:  # Files larger than 10MB
-                compressed_file = pickle_file.with_suffix('.pkl.gz')
+                compressed_file = pickle_file.with_suffix('.pkl.zst')
                 compress_pickle_file(str(pickle_file), str(compressed_file))
+        # Neighbour indices are small but are hosted alongside the pickles
+        topk_file = artifacts_dir / 'topk.npy'
+        if topk_file.exists():
+            compress_pickle_file(str(topk_file), str(topk_file.with_suffix('.npy.zst')))
     
     # Create download script
     create_download_script()
@@ -179,6 +183,7 @@ def main():
     # Create .gitattributes for large files
     gitattributes_content = '''*.pkl filter=lfs diff=lfs merge=lfs -text
 *.pkl.gz filter=lfs diff=lfs merge=lfs -text
+*.pkl.zst filter=lfs diff=lfs merge=lfs -text
 *.csv filter=lfs diff=lfs merge=lfs -text
 '''
     